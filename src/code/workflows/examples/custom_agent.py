@@ -2,46 +2,61 @@ from lib.agents import OptimalReActAgent
 from lib.models import groq, googleAI
 from lib.tools import calculate, run_shell_command, google_search
 import pyttsx3
+import atexit
+import queue
+import threading
 
-# Initialize the TTS engine
+# pyttsx3 drivers are bound to the thread that created them, so one dedicated thread
+# creates the engine, speaks every queued answer and stops the engine on shutdown.
+# Printing and the next prompt never wait on TTS.
+_TTS_STOP = object()
+speech_queue: "queue.Queue" = queue.Queue()
+
+def tts_worker():
+    """Owns the TTS engine: speaks queued answers until the stop sentinel arrives."""
+    engine = pyttsx3.init()
+    while True:
+        text = speech_queue.get()
+        if text is _TTS_STOP:
+            engine.stop()
+            return
+        try:
+            engine.say(text)
+            engine.runAndWait()
+        except Exception as e:
+            print(f"\n[TTS ERROR] {e}")
+
+# Daemon, so a stuck driver can't hang interpreter exit; the atexit hook still stops it cleanly
+tts_thread = threading.Thread(target=tts_worker, name="tts", daemon=True)
+tts_thread.start()
+
+def stop_tts():
+    speech_queue.put(_TTS_STOP)
+    tts_thread.join(timeout=5)
+
+atexit.register(stop_tts)
 
 
 tools = [calculate, run_shell_command, google_search]
 
 agent = OptimalReActAgent(llm=groq(), tools=tools)
-async def main(query: str):
-    """Demonstrates asynchronous streaming."""
 
-        
-    # Set properties (optional)
-    # You can change the voice, rate, or volume
-    # voices = engine.getProperty('voices')
-    # engine.setProperty('voice', voices[1].id) # Change to a different voice if available
-    # engine.setProperty('rate', 150) # Speed of speech (words per minute)
-    # engine.setProperty('volume', 0.9) # Volume (0.0 to 1.0)
+# Several queries on the input line, separated by ';;', run as a batch
+QUERY_SEPARATOR = ";;"
 
-    # Convert text to speech
-    # engine.say("Hello, this is a test of text-to-speech in Python.")
-
-    # # Play the speech and wait for it to finish
-    # engine.runAndWait()
+async def main(query: str):
+    """Demonstrates asynchronous streaming."""
+    queries = [q.strip() for q in query.split(QUERY_SEPARATOR) if q.strip()]
+    if len(queries) > 1:
+        answers = await agent.async_invoke_many(queries)
+        for q, answer in zip(queries, answers):
+            print(f"Q: {q}\nAI: {answer.content}\n")
+        return
 
-    # # Stop the engine (important for releasing resources)
-    # engine.stop()
-    engine = pyttsx3.init()
-    async for event in agent.stream(query):
+    async for event in agent.stream(query, trace=True):
         
         event_type = event["type"]
         content = event["content"]
-        # if event_type == "final_answer":
-        #     engine.say(content)
-        #     print(f"AI: {content}\n")
-        #     engine.runAndWait()
-
-        #     # Stop the engine (important for releasing resources)
-        #     engine.stop()
-
-
         if event_type == "thought":
             print(f" [THOUGHT]: {content}")
         elif event_type == "action_input":
@@ -50,6 +65,7 @@ async def main(query: str):
             print(f" [OBSERVATION]: {content}")
         elif event_type == "final_answer":
             print(f"AI: {content}\n")
+            speech_queue.put_nowait(content)
             # print(f"\n<<< FINAL ANSWER >>>\n{content}\n<<< /FINAL ANSWER >>>")
         elif event_type == "error":
             print(f"\n[!!! AGENT ERROR !!!] {content}")
@@ -1,16 +1,39 @@
 import asyncio
+import atexit
+import queue
 import re
-from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple
-import functools
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from typing import AsyncGenerator, Deque, Dict, Generator, List, Optional, Set, Tuple
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.tools import BaseTool
 from langchain.tools import tool # Needed for the example usage
 from pydantic import BaseModel, Field
+from lib.tools import is_cacheable_observation
 # Define the Stream Event type for consistent output
-# Type: {"type": "thought"|"action_input"|"observation"|"final_answer"|"error", "content": str}
+# Type: {"type": "thought"|"action_input"|"observation"|"final_answer_delta"|"final_answer"|"error", "content": str}
 ReActStreamEvent = Dict[str, str] 
 
+# Marks the end of the event stream relayed by stream_sync
+_STREAM_END = object()
+
+# Prefix of the tool-result message fed back to the LLM
+_OBS_PREFIX = "Observation: "
+
+# Dedicated, bounded pool for synchronous tools, shared by every agent instead of
+# asyncio's default executor. Sized for the parallel tool calls of a few sessions.
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-tool")
+atexit.register(_TOOL_POOL.shutdown, wait=False)
+
+# Tools with side effects or time-dependent output: never served from the tool cache
+# and never replayed from the plan cache
+UNCACHEABLE_TOOLS = frozenset({"finish", "run_shell_command", "file_manager", "code_execute"})
+
 class ToolExecutionError(Exception):
     """Custom exception for tool execution failures."""
     pass
@@ -19,6 +42,46 @@ class ToolNotFoundError(Exception):
     """Custom exception when the LLM suggests a non-existent tool."""
     pass
 
+class PlanCache:
+    """
+    Agentic plan cache: remembers the tool plan (the ordered (tool_name, tool_input)
+    calls) of successful runs, keyed on the normalized query text. Repeating a query
+    replays the plan instead of re-running the full ReAct loop. Replayed inputs are
+    used verbatim, so the key keeps word order and operators ("3+5" is not "5*3"),
+    and plans with side-effecting tools are never stored.
+    One instance can be shared between agents.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._plans: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+
+    def normalize(self, text: str) -> str:
+        """Normalizes a query to lowercase with collapsed whitespace."""
+        return " ".join(text.lower().split())
+
+    def get(self, user_input: str) -> Optional[List[Tuple[str, str]]]:
+        """Returns the cached plan for the same (normalized) query, if any."""
+        key = self.normalize(user_input)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+        return plan
+
+    def put(self, user_input: str, plan: List[Tuple[str, str]]) -> None:
+        """Stores the tool plan of a successful run."""
+        key = self.normalize(user_input)
+        if not key or not plan or any(name in UNCACHEABLE_TOOLS for name, _ in plan):
+            return
+        self._plans[key] = list(plan)
+        self._plans.move_to_end(key)
+        if len(self._plans) > self.max_size:
+            self._plans.popitem(last=False)
+
+    def discard(self, user_input: str) -> None:
+        """Forgets the plan for a query (e.g. after a failed replay)."""
+        self._plans.pop(self.normalize(user_input), None)
+
 # --- Agent Implementation ---
 
 class OptimalReActAgent:
@@ -32,10 +95,21 @@ class OptimalReActAgent:
     1. dense (default): Enforces a strict (Thought -> Action) loop[cite: 127].
     2. sparse: Allows the LLM to decide when to think or act.
     """
-    # Regex to robustly parse LLM output (common LangChain format)
-    ACTION_REGEX = re.compile(r"Action:\s*(\w+)\s*\[(.*?)\]", re.DOTALL)
-    FINAL_ANSWER_REGEX = re.compile(r"Final Answer:\s*(.*)", re.DOTALL)
-    THOUGHT_REGEX = re.compile(r"Thought:\s*(.*)", re.DOTALL)
+    # Single-pass regex to robustly parse LLM output (common LangChain format):
+    # one scan yields the Thought, Action and Final Answer segments.
+    REACT_REGEX = re.compile(
+        r"Thought:\s*(?P<thought>.*?)(?=\s*(?:Action|Final Answer|Observation):|\Z)"
+        r"|Action:\s*(?P<act_name>\w+)\s*\[(?P<act_input>.*?)\]"
+        r"|Final Answer:\s*(?P<final>.*)",
+        re.DOTALL,
+    )
+    # Candidate answer starts inside a (partially) streamed completion; see _find_answer_start
+    ANSWER_START_REGEX = re.compile(r"Action:\s*(?P<act>\w+)\s*\[|Final Answer:\s*")
+    # A "Final Answer:" is over once the model starts another ReAct step on a new line
+    ANSWER_END_REGEX = re.compile(r"\n\s*(?:Observation|Thought|Action|Question)\s*\d*:")
+
+    # Tools with side effects or time-dependent output are never served from the cache
+    UNCACHEABLE_TOOLS = UNCACHEABLE_TOOLS
     
     # Tool used for final completion
     @tool
@@ -52,16 +126,57 @@ class OptimalReActAgent:
         tools: List[BaseTool],
         max_iterations: int = 7,
         sparse_reasoning: bool = False, # <-- MODIFICATION
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        enable_prompt_cache: bool = True,
+        cacheable_tools: Optional[Set[str]] = None,
+        tool_cache_size: int = 256,
+        tool_cache_ttl: float = 3600.0,
+        plan_cache: Optional[PlanCache] = None,
+        plan_llm: Optional[BaseLanguageModel] = None,
+        max_parallel_tools: int = 4,
+        history_window: Optional[int] = 3,
+        summary_llm: Optional[BaseLanguageModel] = None,
+        max_obs_chars: Optional[int] = 2000
     ):
         """Initializes the ReAct Agent."""
         self.llm = llm
         # The agent always includes the 'finish' tool for termination
-        self.tools_map = {t.name: t for t in tools + [self.finish]}
+        # Names are interned so names parsed from LLM output resolve to the same key objects
+        self.tools_map = {sys.intern(t.name): t for t in tools + [self.finish]}
         self.max_iterations = max_iterations
         self.sparse_reasoning = sparse_reasoning # <-- MODIFICATION
         self.tool_names = list(self.tools_map.keys())
+        # Parser specialized once for the reasoning mode
+        self._parse = self._parse_agent_output if sparse_reasoning else self._make_dense_parser()
         self.system_prompt_text = system_prompt or self._get_default_system_prompt(tools)
+        self.enable_prompt_cache = enable_prompt_cache
+        # Built once and reused by every query: the prefix object is identical across calls
+        self._system_message = SystemMessage(content=self._build_system_content())
+
+        # LRU + TTL cache of tool observations: (tool_name, tool_input) -> (timestamp, observation)
+        if cacheable_tools is None:
+            cacheable_tools = set(self.tools_map) - self.UNCACHEABLE_TOOLS
+        self.cacheable_tools = cacheable_tools
+        self.tool_cache_size = tool_cache_size
+        self.tool_cache_ttl = tool_cache_ttl
+        self._tool_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+
+        # Optional plan cache; the (cheaper) plan_llm only phrases the answer of a replayed plan
+        self.plan_cache = plan_cache
+        self.plan_llm = plan_llm or llm
+
+        # Upper bound on tools running at once when one step lists several Actions
+        self.max_parallel_tools = max_parallel_tools
+
+        # Only the last `history_window` (Action, Observation) pairs are sent verbatim;
+        # older turns are folded into one summary written by the (cheaper) summary_llm.
+        self.history_window = history_window
+        self.summary_llm = summary_llm or llm
+        self.summary_cache_size = 64
+        self._summary_cache: "OrderedDict[str, str]" = OrderedDict()
+
+        # Observations longer than this are cut down before entering the history
+        self.max_obs_chars = max_obs_chars
         
     @staticmethod
     def _format_tool_list(tools: List[BaseTool]) -> str:
@@ -94,6 +209,9 @@ class OptimalReActAgent:
                 "Action: tool_name[tool_input]\n\n"
                 "OR\n"
                 "Thought: I need to update my plan. First, I will... [reasoning step]\n\n"
+                "OR, when several independent Actions are needed (they run in parallel)\n"
+                "Action: tool_name[tool_input]\n"
+                "Action: other_tool_name[other_tool_input]\n\n"
                 "Observation: [Tool result]\n"
             )
         else:
@@ -115,112 +233,365 @@ class OptimalReActAgent:
             )
         # <-- MODIFICATION END -->
         
+    def _build_system_content(self):
+        """
+        Builds the SystemMessage content once so the prompt prefix is byte-identical
+        on every turn (OpenAI/Groq/Gemini apply their automatic prefix cache to it).
+        Anthropic needs an explicit cache_control breakpoint on the static block.
+        """
+        if self.enable_prompt_cache and "anthropic" in getattr(self.llm, "_llm_type", ""):
+            return [{
+                "type": "text",
+                "text": self.system_prompt_text,
+                "cache_control": {"type": "ephemeral"},
+            }]
+        return self.system_prompt_text
+
     def _parse_agent_output(self, llm_output: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
         Robustly parses the LLM output for Thought, Action Name, and Action Input.
         Returns: (Thought, Action_Name, Action_Input)
         """
-        thought_match = self.THOUGHT_REGEX.search(llm_output)
-        action_match = self.ACTION_REGEX.search(llm_output)
-        final_answer_match = self.FINAL_ANSWER_REGEX.search(llm_output)
+        # Cheap literal scans first; the regex only runs when an Action or Final Answer is present
+        if "Action:" not in llm_output and "Final Answer:" not in llm_output:
+            start = llm_output.find("Thought:")
+            if start == -1:
+                return None, None, None
+            start += len("Thought:")
+            end = llm_output.find("Observation:", start)
+            return llm_output[start:end if end != -1 else None].strip(), None, None
 
-        thought = thought_match.group(1).strip() if thought_match else None
-        
-        # Check for Final Answer
-        if final_answer_match:
-            final_answer = final_answer_match.group(1).strip()
-            return thought, "finish", final_answer
-            
-        # Check for Action
-        if action_match:
-            action_name = action_match.group(1).strip()
-            action_input = action_match.group(2).strip()
-            return thought, action_name, action_input
-            
-        return thought, None, None
+        thought = action_name = action_input = None
+
+        for match in self.REACT_REGEX.finditer(llm_output):
+            segment = match.lastgroup
+            if segment == "thought":
+                if thought is None:
+                    thought = match.group("thought").strip()
+            elif segment == "act_input":
+                if action_name is None:
+                    action_name = match.group("act_name").strip()
+                    action_input = match.group("act_input").strip()
+            else:
+                # A Final Answer takes precedence over any Action and runs to the end
+                return thought, "finish", match.group("final").strip()
+
+        return thought, action_name, action_input
+
+    def _find_answer_start(self, llm_output: str) -> Optional[re.Match]:
+        """
+        Locates the answer text the parser will also settle on: a "Final Answer:", or a
+        finish[ that is the step's first Action. A finish listed after another Action
+        is dropped by the loop, so it must not be streamed as the answer.
+        """
+        first_action = True
+        for match in self.ANSWER_START_REGEX.finditer(llm_output):
+            act = match.group("act")
+            if act is None or (first_action and act == "finish"):
+                return match
+            first_action = False
+        return None
+
+    def _make_dense_parser(self):
+        """
+        Builds the parser for dense mode. A dense step holds one Thought and one Action,
+        so unless a Final Answer (which takes precedence) is present the scan stops at
+        the first Action instead of walking the rest of the output.
+        """
+        finditer = self.REACT_REGEX.finditer
+        parse_general = self._parse_agent_output
+
+        def parse(llm_output: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+            if "Final Answer:" in llm_output or "Action:" not in llm_output:
+                return parse_general(llm_output)
+
+            thought = None
+            for match in finditer(llm_output):
+                if match.lastgroup == "act_input":
+                    return thought, match.group("act_name").strip(), match.group("act_input").strip()
+                if thought is None:
+                    thought = match.group("thought").strip()
+            return thought, None, None
+
+        return parse
+
+    def _parse_actions(self, llm_output: str) -> List[Tuple[str, str]]:
+        """Returns every (Action_Name, Action_Input) pair in the LLM output, in order."""
+        return [
+            (match.group("act_name").strip(), match.group("act_input").strip())
+            for match in self.REACT_REGEX.finditer(llm_output)
+            if match.lastgroup == "act_input"
+        ]
+
+    async def _execute_tools(self, actions: List[Tuple[str, str]]) -> List[str]:
+        """
+        Executes the Actions of one step concurrently (bounded by max_parallel_tools)
+        and returns their observations in order. The first failure is re-raised once
+        every call has settled.
+        """
+        if len(actions) == 1:
+            return [await self._execute_tool(*actions[0])]
+
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+
+        async def run_limited(tool_name: str, tool_input: str) -> str:
+            async with semaphore:
+                return await self._execute_tool(tool_name, tool_input)
+
+        results = await asyncio.gather(*(run_limited(n, i) for n, i in actions), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
 
     async def _execute_tool(self, tool_name: str, tool_input: str) -> str:
+        """Executes a tool, serving repeated (tool_name, tool_input) calls from the cache."""
+        if tool_name not in self.cacheable_tools:
+            return await self._run_tool(tool_name, tool_input)
+
+        key = (tool_name, tool_input)
+        cached = self._tool_cache.get(key)
+        if cached is not None:
+            timestamp, observation = cached
+            if time.monotonic() - timestamp < self.tool_cache_ttl:
+                self._tool_cache.move_to_end(key)
+                return observation
+            del self._tool_cache[key]
+
+        observation = await self._run_tool(tool_name, tool_input)
+        if not is_cacheable_observation(observation):
+            return observation
+        self._tool_cache[key] = (time.monotonic(), observation)
+        if len(self._tool_cache) > self.tool_cache_size:
+            self._tool_cache.popitem(last=False)
+        return observation
+
+    async def _run_tool(self, tool_name: str, tool_input: str) -> str:
         """Executes a tool asynchronously with error handling."""
-        if tool_name not in self.tools_map:
+        tool_func = self.tools_map.get(sys.intern(tool_name))
+        if tool_func is None:
             raise ToolNotFoundError(f"Tool '{tool_name}' is not recognized.")
-
-        tool_func = self.tools_map[tool_name]
         
         try:
             # Check for async tool implementation
             if asyncio.iscoroutinefunction(tool_func.func):
                 observation = await tool_func.func(tool_input)
             else:
-                # Synchronous tool call executed in a thread pool to prevent blocking
-                # We rely on the event loop management in stream_sync to ensure get_event_loop()
-                # works correctly here.
-                observation = await asyncio.get_event_loop().run_in_executor(
-                    None, functools.partial(tool_func.func, tool_input)
-                )
+                # Synchronous tool call executed in the tool pool to prevent blocking
+                observation = await asyncio.get_running_loop().run_in_executor(_TOOL_POOL, tool_func.func, tool_input)
             
-            return str(observation).strip()
+            return self._truncate_observation(str(observation).strip())
 
         except Exception as e:
             raise ToolExecutionError(f"Error executing tool '{tool_name}' with input '{tool_input}': {type(e).__name__}: {str(e)}")
 
 
-    async def stream(self, user_input: str) -> AsyncGenerator[Dict[str, str], None]:
+    async def _compact_history(self, context: List[BaseMessage], turns: Deque[BaseMessage]) -> None:
+        """
+        Pops the turns that fell out of the history window and folds them (with any
+        previous summary in `context`) into a single summary message, in place.
+        Summaries are cached by their input so an identical prefix is never
+        summarized twice.
+        """
+        if not self.history_window:
+            return
+        keep = 2 * self.history_window
+        if len(turns) <= keep:
+            return
+
+        evicted = context[2:]
+        while len(turns) > keep:
+            evicted.append(turns.popleft())
+        evicted_text = "\n\n".join(str(m.content) for m in evicted)
+
+        summary = self._summary_cache.get(evicted_text)
+        if summary is None:
+            response = await self.summary_llm.ainvoke([
+                SystemMessage(content="Summarize the following agent steps. Keep every fact, number and tool result needed to continue the task."),
+                HumanMessage(content=evicted_text),
+            ])
+            summary = response.content
+            self._summary_cache[evicted_text] = summary
+            if len(self._summary_cache) > self.summary_cache_size:
+                self._summary_cache.popitem(last=False)
+        else:
+            self._summary_cache.move_to_end(evicted_text)
+
+        # A HumanMessage (not a second SystemMessage): Gemini and Anthropic only accept a leading system prompt
+        context[2:] = [HumanMessage(content=f"[prior context]: {summary}")]
+
+    async def _replay_plan(self, user_input: str, plan: List[Tuple[str, str]]) -> AsyncGenerator[Dict[str, str], None]:
+        """Replays a cached tool plan and asks the plan LLM to phrase the final answer."""
+        steps = []
+        for tool_name, tool_input in plan:
+            yield {"type": "action_input", "content": f"Action: {tool_name}[{tool_input}]"}
+            observation = await self._execute_tool(tool_name, tool_input)
+            if observation.startswith("ERROR"):
+                raise ToolExecutionError(f"Cached step '{tool_name}' failed: {observation}")
+            yield {"type": "observation", "content": observation}
+            steps.append(f"Action: {tool_name}[{tool_input}]\nObservation: {observation}")
+
+        response = await self.plan_llm.ainvoke([
+            SystemMessage(content="Answer the user's request using the tool results below. Reply with the final answer only."),
+            HumanMessage(content=f"Request: {user_input}\n\n" + "\n\n".join(steps)),
+        ])
+        yield {"type": "final_answer", "content": response.content}
+
+    def _truncate_observation(self, observation: str) -> str:
+        """Keeps the head and tail of an oversized observation so it doesn't bloat every later prompt."""
+        limit = self.max_obs_chars
+        if not limit or len(observation) <= limit:
+            return observation
+        head = limit * 3 // 4
+        tail = limit - head
+        return f"{observation[:head]}\n... [TRUNCATED {len(observation) - limit} chars] ...\n{observation[-tail:]}"
+
+    async def stream(self, user_input: str, trace: bool = False) -> AsyncGenerator[Dict[str, str], None]:
         """
         The core ReAct loop, yielding events for streaming and tracing (Asynchronous).
         Supports both dense (Thought/Action) and sparse (Thought or Action) reasoning.
+        The "info" and "thought" tracing events are only emitted when `trace` is set.
         """
-        history: List[BaseMessage] = [SystemMessage(content=self.system_prompt_text), HumanMessage(content=user_input)]
+        # 0. Plan cache: replay a known tool plan, falling back to the full loop on failure
+        if self.plan_cache is not None:
+            cached_plan = self.plan_cache.get(user_input)
+            if cached_plan:
+                try:
+                    async for evt in self._replay_plan(user_input, cached_plan):
+                        yield evt
+                    return
+                except Exception as e:
+                    self.plan_cache.discard(user_input)
+                    if trace:
+                        yield {"type": "info", "content": f"Cached plan failed ({type(e).__name__}), running the full ReAct loop."}
+
+        # History = fixed context (system prompt, query, optional summary) + the recent turns;
+        # old turns leave the deque from the left in O(1).
+        context: List[BaseMessage] = [self._system_message, HumanMessage(content=user_input)]
+        turns: Deque[BaseMessage] = deque()
+        plan: List[Tuple[str, str]] = []
         
         for i in range(1, self.max_iterations + 1):
             
             try:
-                # 1. LLM Call
-                yield {"type": "info", "content": f"--- Iteration {i}/{self.max_iterations} ---"}
-                
-                llm_response_message: AIMessage = await self.llm.ainvoke(history)
-                llm_output = llm_response_message.content
+                # 1. LLM Call, streamed so the turn ends as soon as its Action is complete
+                if trace:
+                    yield {"type": "info", "content": f"--- Iteration {i}/{self.max_iterations} ---"}
+
+                llm_output = ""
+                answer_start = None   # index of the answer text once finish/Final Answer is seen
+                answer_closed_by_bracket = False
+                answer_sent = 0
+                async with aclosing(self.llm.astream([*context, *turns])) as llm_stream:
+                    async for chunk in llm_stream:
+                        text = chunk.text
+                        if not text:
+                            continue
+                        llm_output += text
+
+                        # Forward the final answer to the caller while it is being generated
+                        if answer_start is None:
+                            start_match = self._find_answer_start(llm_output)
+                            # Wait for the first answer character so leading whitespace is skipped
+                            if start_match and start_match.end() < len(llm_output):
+                                answer_start = start_match.end()
+                                answer_closed_by_bracket = start_match.group().endswith("[")
+                        if answer_start is not None:
+                            answer_so_far = llm_output[answer_start:]
+                            answer_done = False
+                            if answer_closed_by_bracket:
+                                answer_so_far = answer_so_far.partition("]")[0]
+                            else:
+                                end_match = self.ANSWER_END_REGEX.search(answer_so_far)
+                                if end_match:
+                                    # Drop the hallucinated continuation and stop generating
+                                    answer_so_far = answer_so_far[:end_match.start()]
+                                    llm_output = llm_output[:answer_start + end_match.start()]
+                                    answer_done = True
+                                else:
+                                    # Hold back the current line: it may still turn into a marker
+                                    answer_so_far = answer_so_far[:answer_so_far.rfind("\n") + 1]
+                            if len(answer_so_far) > answer_sent:
+                                yield {"type": "final_answer_delta", "content": answer_so_far[answer_sent:]}
+                                answer_sent = len(answer_so_far)
+                            if answer_done:
+                                break
+
+                        if self.sparse_reasoning:
+                            # Several Actions may be listed; stop once the model starts
+                            # inventing an Observation of its own.
+                            cut = llm_output.find("Observation:", max(0, len(llm_output) - len(text) - len("Observation:")))
+                            if cut != -1:
+                                llm_output = llm_output[:cut]
+                                break
+                        # An Action is complete once its closing bracket arrives (a "Final Answer:"
+                        # runs to the end of the output); leaving the loop closes the stream and
+                        # stops the remaining generation.
+                        elif "]" in text and (answer_start is None or answer_closed_by_bracket):
+                            if self._parse(llm_output)[1] is not None:
+                                break
+
+                # Flush the part of a "Final Answer:" held back while streaming
+                if answer_start is not None and not answer_closed_by_bracket and len(llm_output) - answer_start > answer_sent:
+                    yield {"type": "final_answer_delta", "content": llm_output[answer_start + answer_sent:]}
 
                 # <-- MODIFICATION START -->
                 # For sparse reasoning, always add the LLM's output to history
                 # This allows for "thought-only" steps
                 if self.sparse_reasoning:
-                    history.append(llm_response_message)
+                    turns.append(AIMessage(content=llm_output))
                 # <-- MODIFICATION END -->
                 
                 # 2. Parsing LLM Output
-                thought, action_name, action_input = self._parse_agent_output(llm_output)
+                thought, action_name, action_input = self._parse(llm_output)
 
                 # 3. Output Thought (for tracing)
-                if thought:
+                if trace and thought:
                     yield {"type": "thought", "content": thought}
                 
                 # 4. Handle Final Answer
                 if action_name == "finish":
                     final_answer = action_input or llm_output
+                    if self.plan_cache is not None:
+                        self.plan_cache.put(user_input, plan)
                     yield {"type": "final_answer", "content": final_answer}
                     return 
                 
                 # 5. Handle Action
                 action_executed = False # Flag to track if an action was taken
                 if action_name and action_input is not None:
+                    # Sparse steps may list several independent Actions ('finish' ends the run, never a parallel step)
+                    if self.sparse_reasoning:
+                        actions = [a for a in self._parse_actions(llm_output) if a[0] != "finish"]
+                    else:
+                        actions = [(action_name, action_input)]
+
+                    for name, tool_input in actions:
+                        yield {"type": "action_input", "content": f"Action: {name}[{tool_input}]"}
                     
-                    yield {"type": "action_input", "content": f"Action: {action_name}[{action_input}]"}
-                    
-                    # 6. Execute Tool
-                    observation = await self._execute_tool(action_name, action_input)
+                    # 6. Execute Tool(s), concurrently when there are several
+                    observations = await self._execute_tools(actions)
                     action_executed = True
+                    plan.extend(actions)
                     
                     # 7. Output Observation (for tracing)
-                    yield {"type": "observation", "content": observation}
+                    for observation in observations:
+                        yield {"type": "observation", "content": observation}
                     
                     # 8. Update History for next turn
                     # <-- MODIFICATION START -->
                     if not self.sparse_reasoning:
                         # Dense mode: add the LLM's T-A pair now
-                        history.append(AIMessage(content=llm_output))
+                        turns.append(AIMessage(content=llm_output))
                     
-                    # Both modes: add the tool observation
-                    history.append(HumanMessage(content=f"Observation: {observation}"))
+                    # Both modes: add the tool observation(s) as one block
+                    if len(actions) == 1:
+                        turns.append(HumanMessage(content=_OBS_PREFIX + observations[0]))
+                    else:
+                        turns.append(HumanMessage(content="\n".join(
+                            f"Observation ({name}[{tool_input}]): {observation}"
+                            for (name, tool_input), observation in zip(actions, observations)
+                        )))
                     # <-- MODIFICATION END -->
 
                 # 9. Handle invalid LLM output based on reasoning mode
@@ -238,6 +609,11 @@ class OptimalReActAgent:
                     return
                 # <-- MODIFICATION END -->
 
+                # 10. Keep the prompt bounded: summarize turns outside the history window,
+                # but only when another LLM call will actually read the summary
+                if i < self.max_iterations:
+                    await self._compact_history(context, turns)
+
             except ToolNotFoundError as e:
                 yield {"type": "error", "content": f"Parsing Error: {str(e)}. The tool suggested does not exist."}
                 return
@@ -250,48 +626,60 @@ class OptimalReActAgent:
                 yield {"type": "error", "content": f"An unexpected error occurred during iteration {i}: {type(e).__name__}: {str(e)}"}
                 return
         
-        # 10. Max Iterations reached
+        # 11. Max Iterations reached
         yield {"type": "error", "content": f"Max iterations ({self.max_iterations}) reached without finding a Final Answer. Agent stopped."}
 
 
     # --- Synchronous Methods (Implementations for LangChain compatibility and sync usage) ---
 
-    def stream_sync(self, user_input: str) -> Generator[Dict[str, str], None, None]:
-        """Synchronous wrapper for the asynchronous stream method."""
-        loop = None
-        newly_created = False
-        
-        try:
-            # 1. Try to get the running loop (if nested async)
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            # 2. If not running, create a dedicated loop for synchronous execution
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop) # Set the new loop as current for this thread
-            newly_created = True
-
-        async_gen = self.stream(user_input)
-        
+    def stream_sync(self, user_input: str, trace: bool = False) -> Generator[Dict[str, str], None, None]:
+        """
+        Synchronous wrapper for the asynchronous stream method. The generator runs on
+        its own event loop in a background thread and events are relayed through a
+        thread-safe queue, so the loop is started once per query (not once per event)
+        and the caller's thread may even have a loop running already.
+        """
+        events: "queue.Queue" = queue.Queue()
+        loop: Optional[asyncio.AbstractEventLoop] = None
+        task: Optional[asyncio.Task] = None
+        # Set by the consumer when it stops early. Publishing loop/task before checking it here,
+        # and setting it before reading loop/task below, means one side always sees the other.
+        abandoned = threading.Event()
+
+        async def produce():
+            nonlocal loop, task
+            loop, task = asyncio.get_running_loop(), asyncio.current_task()
+            try:
+                if abandoned.is_set():
+                    return
+                async for evt in self.stream(user_input, trace=trace):
+                    events.put(evt)
+            except Exception as e:
+                # Catch any exceptions during generator execution
+                events.put({"type": "error", "content": f"Synchronous streaming error: {type(e).__name__}: {str(e)}"})
+            finally:
+                events.put(_STREAM_END)
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except asyncio.CancelledError:
+                pass
+
+        worker = threading.Thread(target=run, name="agent-stream", daemon=True)
+        worker.start()
         try:
-            while True:
-                try:
-                    # Use run_until_complete to block until the next item is yielded
-                    next_event = loop.run_until_complete(async_gen.__anext__())
-                    yield next_event
-                except StopAsyncIteration:
-                    # Generator finished its work
-                    break
-                except Exception as e:
-                    # Catch any exceptions during generator execution
-                    yield {"type": "error", "content": f"Synchronous streaming error: {type(e).__name__}: {str(e)}"}
-                    break
+            while (evt := events.get()) is not _STREAM_END:
+                yield evt
         finally:
-            # 3. Cleanup: If we created the loop, close it and unset it
-            if newly_created and loop is not None:
-                loop.close()
-                # Unset the loop if it's still the current one
-                if asyncio.get_event_loop() is loop:
-                    asyncio.set_event_loop(None)
+            # The caller stopped early: cancel the rest of the run instead of waiting for it
+            abandoned.set()
+            if worker.is_alive() and loop is not None:
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass  # The loop already finished
+            worker.join()
 
 
     def invoke(self, user_input: str) -> AIMessage:
@@ -329,4 +717,17 @@ class OptimalReActAgent:
         if result:
             return AIMessage(content="".join(result))
         else:
-            return AIMessage(content="[ERROR] Agent stopped without providing a Final Answer or an explicit error event.")
\ No newline at end of file
+            return AIMessage(content="[ERROR] Agent stopped without providing a Final Answer or an explicit error event.")
+
+    async def async_invoke_many(self, queries: List[str], concurrency: int = 8) -> List[AIMessage]:
+        """
+        Runs independent queries concurrently (at most `concurrency` sessions at a time)
+        and returns their final AIMessages in the order of `queries`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def invoke_one(query: str) -> AIMessage:
+            async with semaphore:
+                return await self.async_invoke(query)
+
+        return await asyncio.gather(*(invoke_one(q) for q in queries))
\ No newline at end of file
@@ -2,13 +2,17 @@
 import asyncio
 
 import re
-from typing import Any, AsyncGenerator, Dict, List, Optional
+from typing import Any, AsyncGenerator, Dict, Iterable, List, Optional, Set
 import os
-from collections import deque 
+from collections import OrderedDict, deque 
+from contextlib import aclosing
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage, ToolMessage
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.tools import BaseTool, Tool 
 
+from lib.prompts import get_agent_prompt
+from lib.tools import is_cacheable_observation
+
 
 from dotenv import load_dotenv, find_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -21,33 +25,78 @@ api_key = os.getenv("GOOGLE_API_KEY")
 
 ReActStreamEvent = Dict[str, str]  # {"type": "thought"|"observation"|"final_answer"|"error", "content": str}
 
+# ReAct output grammar, compiled once at import. The alternatives are tried in
+# priority order by a single anchored match:
+#   1. perfect: "Thought: ... Action: name[input]" ending the text
+#   2. action:  "Action: name[input]" anywhere, with whatever text precedes it
+#   3. thought: a "Thought: " with no parsable Action
+_PATTERN_REACT = re.compile(
+    r"\A(?:"
+    r".*?(?P<perfect>Thought: .*?\s*Action: (?P<perfect_name>.*?)\s*\[(?P<perfect_input>.*?)\]\s*$)"
+    r"|(?P<prefix>.*?)Action: (?P<action_name>.*?)\s*\[(?P<action_input>.*?)\]"
+    r"|.*?Thought: "
+    r")",
+    re.DOTALL | re.IGNORECASE,
+)
+
+# run_shell_command puts the captured stdout after this marker; located with str.find
+_STDOUT_MARKER = "[STDOUT]:"
+
+
+def _matching_bracket(text: str, open_index: int) -> int:
+    """Index of the ']' closing the '[' at open_index (nested brackets allowed), or -1."""
+    depth, i = 1, open_index
+    while depth:
+        close = text.find("]", i + 1)
+        if close == -1:
+            return -1
+        nested_open = text.find("[", i + 1, close)
+        if nested_open != -1:
+            depth, i = depth + 1, nested_open
+        else:
+            depth, i = depth - 1, close
+    return i
+
+
+def _complete_action_end(text: str) -> int:
+    """End index of the first 'Action: name[input]' once its brackets are balanced, or -1."""
+    action_start = text.find("Action: ")
+    if action_start == -1:
+        return -1
+    open_index = text.find("[", action_start)
+    if open_index == -1:
+        return -1
+    close_index = _matching_bracket(text, open_index)
+    return close_index + 1 if close_index != -1 else -1
+
+
+def _parse_action_fast(text: str) -> Optional[tuple[str, str, str]]:
+    """
+    Linear str.find scan for the common well-formed output: one 'Thought: ...' followed
+    by a single 'Action: name[input]' that ends the text. Returns None for anything
+    else so the caller falls back to the regex patterns.
+    """
+    action_start = text.find("Action: ")
+    if action_start == -1 or text.find("Action: ", action_start + 1) != -1:
+        return None
+    thought_start = text.find("Thought: ", 0, action_start)
+    if thought_start == -1:
+        return None
+    open_index = text.find("[", action_start)
+    if open_index == -1:
+        return None
+    close_index = _matching_bracket(text, open_index)
+    if close_index == -1 or text[close_index + 1:].strip():
+        return None
+
+    action_name = text[action_start + len("Action: "):open_index].strip()
+    action_input = text[open_index + 1:close_index].strip()
+    return (text[thought_start:].strip(), action_name, action_input)
 
-def get_default_system_prompt(tools: List[BaseTool]) -> str:
+
+def get_default_system_prompt(tools: Iterable[BaseTool]) -> str:
     """ReAct (Yao et al., 2022) style system prompt, optimized for detailed reasoning."""
-    tool_list = "\n".join([f"- {t.name}: {t.description}" for t in tools])
-
-    return (
-        "You are an intelligent reasoning agent that follows the ReAct format exactly.\n"
-        "You can reason (Thought), act (Action), and observe (Observation).\n"
-        "At each step, output **only one Thought and one Action**.\n"
-        "After the tool executes, you will receive an Observation.\n"
-        "Then continue reasoning, acting, and observing until you have a final answer.\n\n"
-        
-        "Your response MUST always contain a Thought and an Action in the exact format.\n"
-        "**CRITICAL:** Once you have the final answer (either immediately or after searching), you MUST use the **Action: finish[<final answer>]** format. **DO NOT EVER STOP OUTPUTTING BEFORE THIS STEP IS COMPLETE.**\n"
-        
-        "Example of a simple response:\n"
-        "Thought: The user is greeting me. I should respond conversationally and use the finish tool immediately.\n"
-        "Action: finish[Hello! I am an intelligent reasoning agent. How can I assist you with your query today?]\n\n"
-        
-        "The following tools are available:\n"
-        f"{tool_list}\n\n"
-        "Follow this exact format:\n"
-        "Thought: [Your reasoning]\n"
-        "Action: [Tool name][Tool input]\n\n"
-        "Do NOT output the Observation. You will receive it in the next turn.\n"
-        "Do NOT repeat the same Thought/Action sequence."
-    )
+    return get_agent_prompt(tools)
 
 
 class ReActAgent:
@@ -55,6 +104,9 @@ class ReActAgent:
     A ReAct (Reasoning and Acting) agent built to enforce the strict
     Thought -> Action -> Observation loop using streaming for language model output.
     """
+    # Non-idempotent tools always run; everything else may be served from the tool cache
+    UNCACHEABLE_TOOLS = {"finish", "run_shell_command", "file_manager", "code_execute"}
+
     def __init__(
         self,
         llm: BaseLanguageModel,
@@ -62,46 +114,74 @@ class ReActAgent:
         system_prompt: Optional[str] = None,
         max_iterations: int = 5,
         history_length: int = 3, # How many recent actions to check for loops
+        cacheable_tools: Optional[Set[str]] = None,
+        tool_cache_size: int = 128,
+        prewarm: bool = True,
     ):
         self.llm = llm
-        self.tools = tools
+        self.tools: Dict[str, BaseTool] = {t.name: t for t in tools}
+        self._available_tools_str = str(list(self.tools))  # tool set is fixed; rendered once for the not-found error
         self.max_iterations = max_iterations
         self.history_length = history_length
-        self.action_history = deque(maxlen=history_length) # Track recent actions
+        self.action_history = deque(maxlen=history_length) # Track recent actions (eviction order)
+        self._action_set: Set[tuple[str, str]] = set() # Same actions, for O(1) membership checks
         self.messages: List[BaseMessage] = []
-        self._tool_map = {t.name: t for t in self.tools}
         self._last_action: Optional[tuple[str, str, str]] = None  # (full_text, action_name, action_input)
-        self._system_prompt = system_prompt or get_default_system_prompt(self.tools)
+        self._pending_observation: Optional[asyncio.Task] = None  # tool started as soon as its Action was parsed
+        self._system_prompt = system_prompt or get_default_system_prompt(self.tools.values())
+        # Persistent conversation, SystemMessage first, passed to the LLM as-is
+        self.messages.append(SystemMessage(content=self._system_prompt))
+
+        # LRU cache of observations, kept across iterations and queries: (tool_name, tool_input) -> observation
+        if cacheable_tools is None:
+            cacheable_tools = set(self.tools) - self.UNCACHEABLE_TOOLS
+        self.cacheable_tools = cacheable_tools
+        self.tool_cache_size = tool_cache_size
+        self._tool_cache: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+
+        # Open the LLM connection (TLS/HTTP setup) in the background while the first query is
+        # still being typed. Only possible when the agent is built inside a running event loop.
+        self._warmup: Optional[asyncio.Task] = None
+        if prewarm:
+            try:
+                self._warmup = asyncio.get_running_loop().create_task(self._prewarm())
+            except RuntimeError:
+                pass
+
+    async def _prewarm(self) -> None:
+        """One-token request whose only purpose is to establish the LLM connection."""
+        try:
+            await self.llm.ainvoke([HumanMessage(content="ping")], max_tokens=1)
+        except Exception:
+            pass
 
     def _parse_action(self, text: str) -> Optional[tuple[str, str, str]]:
         """
         Parses the LLM output for the Thought and Action.
         """
-        
-        # 1. Look for the perfect ReAct pattern (Thought + Action at the end)
-        pattern_perfect = re.compile(
-            r"Thought: (.*?)\s*Action: (.*?)\s*\[(.*?)\]\s*$",
-            re.DOTALL | re.IGNORECASE
-        )
-        match_perfect = pattern_perfect.search(text)
-        if match_perfect:
-            full_text = match_perfect.group(0).strip()
-            action_name = match_perfect.group(2).strip()
-            action_input = match_perfect.group(3).strip()
+        # 0. Fast path: a single well-formed Thought/Action needs no regex at all
+        fast = _parse_action_fast(text)
+        if fast is not None:
+            return fast
+
+        match = _PATTERN_REACT.match(text)
+        if match is None:
+            return None
+
+        # 1. The perfect ReAct pattern (Thought + Action at the end)
+        if match.group("perfect") is not None:
+            full_text = match.group("perfect").strip()
+            action_name = match.group("perfect_name").strip()
+            action_input = match.group("perfect_input").strip()
             return (full_text, action_name, action_input)
 
-        # 2. Aggressively look for an Action pattern anywhere, regardless of Thought formatting
-        pattern_action_only = re.compile(
-            r"Action: (.*?)\s*\[(.*?)\]",
-            re.DOTALL | re.IGNORECASE
-        )
-        match_action_only = pattern_action_only.search(text)
-        if match_action_only:
-            action_name = match_action_only.group(1).strip()
-            action_input = match_action_only.group(2).strip()
+        # 2. An Action pattern anywhere, regardless of Thought formatting
+        if match.group("action_name") is not None:
+            action_name = match.group("action_name").strip()
+            action_input = match.group("action_input").strip()
             
             # Synthesize Thought from preceding text, or create a default one
-            thought_text = text[:match_action_only.start()].strip()
+            thought_text = match.group("prefix").strip()
             if not thought_text:
                 thought_text = f"Synthesized Thought: Agent found an unformatted Action intent in the raw output."
 
@@ -109,61 +189,89 @@ class ReActAgent:
             
             return (synthetic_full_text, action_name, action_input)
 
-        # 3. Look for a Thought only (or partial conversational text)
-        thought_pattern = re.compile(r"Thought: (.*?)\s*$", re.DOTALL | re.IGNORECASE)
-        thought_match = thought_pattern.search(text)
-        if thought_match:
-            return (text.strip(), "", "")
-        
-        return None
+        # 3. A Thought only (or partial conversational text)
+        return (text.strip(), "", "")
+
+    def _is_repeated_action(self, action_name: str, action_input: str) -> bool:
+        """True if this action was already taken within the loop-detection window."""
+        return (action_name.lower(), action_input) in self._action_set
+
+    def _record_action(self, signature: tuple[str, str]) -> None:
+        """Adds an action to the loop-detection window, evicting the oldest when full."""
+        if self.action_history.maxlen == 0:
+            return  # history_length=0 disables loop detection
+        if self.action_history and len(self.action_history) == self.action_history.maxlen:
+            self._action_set.discard(self.action_history[0])
+        self.action_history.append(signature)
+        self._action_set.add(signature)
 
     async def _stream_thought_action(self) -> AsyncGenerator[ReActStreamEvent, None]:
         """Streams the LLM's response until a complete Action is parsed."""
         
-        prompt_messages = [SystemMessage(content=self._system_prompt)] + self.messages
-        
         # 1. Stronger Instruction Injection: If a tool was just executed successfully, 
         # tell the model explicitly to use the observation content.
-        if self.messages and isinstance(self.messages[-1], ToolMessage) and "SUCCESS" in self.messages[-1].content:
-            prompt_messages.append(HumanMessage(content="CRITICAL: You have the successful observation. Immediately generate the final answer using the Thought: ... Action: finish[...] format. DO NOT HALLUCINATE A FAILURE. Copy the observation content *exactly* into the finish[] action."))
+        # It is appended for this call only and removed again once the stream is done.
+        last = self.messages[-1]
+        last_is_tool = isinstance(last, ToolMessage)
+        is_success_tool = last_is_tool and "SUCCESS" in last.content
+        last_content = last.content if is_success_tool else ""
+        if is_success_tool:
+            self.messages.append(HumanMessage(content="CRITICAL: You have the successful observation. Immediately generate the final answer using the Thought: ... Action: finish[...] format. DO NOT HALLUCINATE A FAILURE. Copy the observation content *exactly* into the finish[] action."))
         
         full_response = ""
         action_found = False
+        self._pending_observation = None
         
-        # Collect the full streaming output first
-        async for chunk in self.llm.astream(prompt_messages):
-            if chunk.content:
-                full_response += chunk.content
-
-        # Now parse the full output
+        # Stream until the first Action is complete, then close the stream so the
+        # remaining (usually hallucinated) tokens are never generated
+        try:
+            async with aclosing(self.llm.astream(self.messages)) as llm_stream:
+                async for chunk in llm_stream:
+                    if not chunk.content:
+                        continue
+                    full_response += chunk.content
+                    if "]" in chunk.content:
+                        action_end = _complete_action_end(full_response)
+                        if action_end != -1:
+                            full_response = full_response[:action_end]
+                            break
+        finally:
+            if is_success_tool:
+                self.messages.pop()
+
+        # Now parse the output
         parsed_action = self._parse_action(full_response)
         
         if parsed_action and parsed_action[1]: # Action name is non-empty
             self._last_action = parsed_action
+            # Start the tool now, so it runs while the caller handles the event
+            _, action_name, action_input = parsed_action
+            if action_name.lower() != "finish" and not self._is_repeated_action(action_name, action_input):
+                self._pending_observation = asyncio.create_task(self._execute_tool(action_name, action_input))
             yield {"type": "thought_action", "content": parsed_action[0]}
             action_found = True
 
         # --- REPAIR LOGIC: Force Finish Action, prioritizing successful Observation content ---
         # The condition checks if an action wasn't found OR if there's a successful observation.
-        if not action_found and (full_response.strip() or (self.messages and isinstance(self.messages[-1], ToolMessage))):
+        if not action_found and (full_response.strip() or last_is_tool):
              
             raw_output_snippet = full_response.strip()
             final_answer_content = raw_output_snippet # Default to LLM's partial output
 
             # *** THE CRITICAL FIX: OVERRIDE LLM OUTPUT WITH SUCCESSFUL OBSERVATION ***
-            if self.messages and isinstance(self.messages[-1], ToolMessage) and "SUCCESS" in self.messages[-1].content:
+            if is_success_tool:
                 
-                last_observation_content = self.messages[-1].content
+                last_observation_content = last_content
                 synthetic_thought = (
                     "Agent successfully executed a tool and received a SUCCESS Observation, but failed to form a complete Action or hallucinated an incorrect answer. "
                     "Forcing a 'finish' action by synthesizing the final answer from the verified Observation content."
                 )
                 
                 # Extract the clean STDOUT content for presentation (this is key)
-                stdout_match = re.search(r"\[STDOUT\]:\s*(.*)", last_observation_content, re.DOTALL)
-                if stdout_match:
+                stdout_index = last_observation_content.find(_STDOUT_MARKER)
+                if stdout_index != -1:
                     # Use the clean STDOUT content
-                    final_answer_content = stdout_match.group(1).strip()
+                    final_answer_content = last_observation_content[stdout_index + len(_STDOUT_MARKER):].strip()
                 else:
                     # Fallback to the full successful observation content
                     final_answer_content = last_observation_content.strip() 
@@ -187,27 +295,41 @@ class ReActAgent:
 
 
     async def _execute_tool(self, name: str, input_str: str) -> str:
-        """Executes the specified tool and returns the observation."""
-        tool = self._tool_map.get(name)
+        """Executes the specified tool and returns the observation, reusing cached results."""
+        tool = self.tools.get(name)
         if not tool:
-            return f"Error: Tool '{name}' not found. Available tools: {list(self._tool_map.keys())}"
+            return f"Error: Tool '{name}' not found. Available tools: {self._available_tools_str}"
+
+        cacheable = name in self.cacheable_tools
+        key = (name, input_str.strip())
+        if cacheable:
+            cached = self._tool_cache.get(key)
+            if cached is not None:
+                self._tool_cache.move_to_end(key)
+                return cached
 
         try:
             observation = await tool.ainvoke(input_str)
             
             if not isinstance(observation, str):
                 observation = str(observation)
-                
-            return observation
         except Exception as e:
+            # Failures are not cached, so a later call can still succeed
             return f"Tool Execution Error for {name}: {e}"
 
+        if cacheable and is_cacheable_observation(observation):
+            self._tool_cache[key] = observation
+            if len(self._tool_cache) > self.tool_cache_size:
+                self._tool_cache.popitem(last=False)
+        return observation
+
     async def stream(self, query: str) -> AsyncGenerator[ReActStreamEvent, None]:
         """Executes the ReAct loop until a final answer is found or max iterations are reached."""
         
-        self.messages.clear()
+        del self.messages[1:]  # Keep the SystemMessage
         self.messages.append(HumanMessage(content=query))
         self.action_history.clear() 
+        self._action_set.clear()
 
         for i in range(1, self.max_iterations + 1):
             try:
@@ -226,29 +348,35 @@ class ReActAgent:
                 # --- LOOP DETECTION LOGIC ---
                 current_action_signature = (action_name.lower(), action_input)
                 
-                if action_name.lower() != "finish" and current_action_signature in self.action_history:
+                if action_name.lower() != "finish" and self._is_repeated_action(action_name, action_input):
                     yield {
                         "type": "error", 
                         "content": f"Loop Detected on iteration {i}: Repetitive action '{action_name}[{action_input}]'. Terminating early to prevent infinite execution. Revise your thought process."
                     }
                     return
 
-                self.action_history.append(current_action_signature)
+                self._record_action(current_action_signature)
                 # --- END LOOP LOGIC ---
 
+                # Memory keeps the first Thought as a format cue; later steps store only the Action
+                ai_message = AIMessage(content=full_text if i == 1 else f"Action: {action_name}[{action_input}]")
+
                 # 2. Check for Finish Action
                 if action_name.lower() == "finish":
-                    self.messages.append(AIMessage(content=full_text))
+                    self.messages.append(ai_message)
                     yield {"type": "final_answer", "content": action_input}
                     return 
 
-                # 3. Execute Tool Action
-                observation = await self._execute_tool(action_name, action_input)
+                # 3. Execute Tool Action (already started while the Action was being streamed)
+                if self._pending_observation is not None:
+                    observation = await self._pending_observation
+                else:
+                    observation = await self._execute_tool(action_name, action_input)
                 
                 # 4. Add Observation to Memory
                 yield {"type": "observation", "content": observation}
                 
-                self.messages.append(AIMessage(content=full_text))
+                self.messages.append(ai_message)
                 tool_msg = ToolMessage(
                     content=observation, 
                     tool_call_id=f"call_{action_name}_{i}", 
@@ -259,6 +387,12 @@ class ReActAgent:
             except Exception as e:
                 yield {"type": "error", "content": str(e)}
                 return
+            finally:
+                # A tool started while streaming must not keep running detached when the
+                # consumer stops early (aclose/break), the step fails or the task is cancelled
+                pending, self._pending_observation = self._pending_observation, None
+                if pending is not None and not pending.done():
+                    pending.cancel()
 
         # --- MAX ITERATION FAILURE LOGIC ---
         yield {
@@ -273,10 +407,18 @@ from lib.tools import  google_search, run_shell_command, calculate, finish
 # === Example Usage (Interactive CLI) ===
 if __name__ == "__main__":
 
+    import sys
+    from lib.hf import ainput, loop_factory
+
     tools = [google_search, calculate, run_shell_command]
 
     async def main():
-        llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
+        # Set VLLM_BASE_URL (and optionally VLLM_MODEL) to use a local inference server instead
+        if os.getenv("VLLM_BASE_URL"):
+            from lib.models import vllm_local
+            llm = vllm_local(os.environ["VLLM_BASE_URL"], os.getenv("VLLM_MODEL", "meta-llama/Llama-3.1-8B-Instruct"))
+        else:
+            llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash")
         agent = ReActAgent(llm=llm, tools=[*tools, finish], max_iterations=7)
 
         print("--- AI Agent Initiated ---")
@@ -284,7 +426,7 @@ if __name__ == "__main__":
 
         quary = ''
         while quary != "quit":
-            quary = input("\n\n?: ")
+            quary = await ainput("\n\n?: ")
             
             if quary == "quit":
                 break
@@ -311,10 +453,17 @@ if __name__ == "__main__":
 
                     print(f"AI: {full_result}")
 
+    def _in_jupyter() -> bool:
+        """IPython/Jupyter already runs an event loop, so asyncio.run needs nest_asyncio there."""
+        return "IPython" in sys.modules
+
     # Run the main async function
     try:
-        import nest_asyncio
-        nest_asyncio.apply()
-        asyncio.run(main())
+        if _in_jupyter():
+            import nest_asyncio
+            nest_asyncio.apply()
+            asyncio.run(main())
+        else:
+            asyncio.run(main(), loop_factory=loop_factory)
     except KeyboardInterrupt:
         print("\nExiting agent.")
\ No newline at end of file
@@ -4,6 +4,43 @@ import sys
 
 import asyncio
 import inspect # Helps check if the callback is async
+import threading
+
+# Optional: uvloop's libuv event loop makes each await/callback dispatch cheaper
+try:
+    import uvloop
+    loop_factory = uvloop.new_event_loop
+except ImportError:
+    loop_factory = None
+
+async def ainput(prompt: str = "") -> str:
+    """
+    Awaitable input(). stdin is read on a daemon thread, so the event loop keeps
+    running background tasks (TTS, tool prefetch, LLM warm-up) while the user types.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def deliver(result, error):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def read():
+        try:
+            result, error = input(prompt), None
+        except Exception as e: # EOFError when stdin is closed
+            result, error = None, e
+        try:
+            loop.call_soon_threadsafe(deliver, result, error)
+        except RuntimeError:
+            pass # The loop already closed (e.g. after Ctrl+C)
+
+    threading.Thread(target=read, name="ainput", daemon=True).start()
+    return await future
 
 def run_loop(cb, input_name="input: "):
     """
@@ -14,8 +51,8 @@ def run_loop(cb, input_name="input: "):
         query = '' 
         while query != "quit":
             try:
-                query = input(input_name).strip()
-            except (KeyboardInterrupt, EOFError):
+                query = (await ainput(input_name)).strip()
+            except (KeyboardInterrupt, EOFError, asyncio.CancelledError):
                 print("\nOperation cancelled by user. Exiting loop.")
                 break
 
@@ -38,4 +75,4 @@ def run_loop(cb, input_name="input: "):
                     print(f"-----------------------------------\n")
 
     # Run the inner_loop asynchronous loop
-    asyncio.run(inner_loop())
+    asyncio.run(inner_loop(), loop_factory=loop_factory)
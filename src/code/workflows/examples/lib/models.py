@@ -21,4 +21,17 @@ def groq(model_name="llama-3.3-70b-versatile"):
 def googleAI(model="gemini-2.0-flash"):
     return ChatGoogleGenerativeAI(model=model)
 
+# Local OpenAI-compatible server (vLLM / TGI). Agents keep their message list
+# append-only, so the server's prefix cache only has to prefill the new turn.
+def vllm_local(base_url="http://localhost:8000/v1", model="meta-llama/Llama-3.1-8B-Instruct"):
+    from langchain_openai import ChatOpenAI  # optional: pip install langchain-openai
+
+    return ChatOpenAI(
+        base_url=base_url,
+        model=model,
+        api_key="EMPTY",
+        streaming=True,
+        temperature=0.7
+    )
+
 # print(chat_completion.choices[0].message.content)
\ No newline at end of file
@@ -1,29 +1,42 @@
-from typing import List
+from functools import lru_cache
+from typing import Iterable, Tuple
 from langchain_core.tools import BaseTool
 
-def get_agent_prompt(tools: List[BaseTool]) -> str:
-    """ReAct (Yao et al., 2022) style system prompt, optimized for detailed reasoning."""
-    tool_list = "\n".join([f"- {t.name}: {t.description}" for t in tools])
+# Static parts of the ReAct prompt; only the tool list between them varies
+_PROMPT_HEADER = (
+    "You are an intelligent reasoning agent that follows the ReAct format exactly.\n"
+    "You can reason (Thought), act (Action), and observe (Observation).\n"
+    "At each step, output **only one Thought and one Action**.\n"
+    "After the tool executes, you will receive an Observation.\n"
+    "Then continue reasoning, acting, and observing until you have a final answer.\n\n"
+    
+    "Your response MUST always contain a Thought and an Action in the exact format.\n"
+    "**CRITICAL:** Once you have the final answer (either immediately or after searching), you MUST use the **Action: finish[<final answer>]** format. **DO NOT EVER STOP OUTPUTTING BEFORE THIS STEP IS COMPLETE.**\n"
+    
+    "Example of a simple response:\n"
+    "Thought: The user is greeting me. I should respond conversationally and use the finish tool immediately.\n"
+    "Action: finish[Hello! I am an intelligent reasoning agent. How can I assist you with your query today?]\n\n"
+    
+    "The following tools are available:\n"
+)
+
+_PROMPT_FOOTER = (
+    "\n\n"
+    "Follow this exact format:\n"
+    "Thought: [Your reasoning]\n"
+    "Action: [Tool name][Tool input]\n\n"
+    "Do NOT output the Observation. You will receive it in the next turn.\n"
+    "Do NOT repeat the same Thought/Action sequence."
+)
+
 
-    return (
-        "You are an intelligent reasoning agent that follows the ReAct format exactly.\n"
-        "You can reason (Thought), act (Action), and observe (Observation).\n"
-        "At each step, output **only one Thought and one Action**.\n"
-        "After the tool executes, you will receive an Observation.\n"
-        "Then continue reasoning, acting, and observing until you have a final answer.\n\n"
-        
-        "Your response MUST always contain a Thought and an Action in the exact format.\n"
-        "**CRITICAL:** Once you have the final answer (either immediately or after searching), you MUST use the **Action: finish[<final answer>]** format. **DO NOT EVER STOP OUTPUTTING BEFORE THIS STEP IS COMPLETE.**\n"
-        
-        "Example of a simple response:\n"
-        "Thought: The user is greeting me. I should respond conversationally and use the finish tool immediately.\n"
-        "Action: finish[Hello! I am an intelligent reasoning agent. How can I assist you with your query today?]\n\n"
-        
-        "The following tools are available:\n"
-        f"{tool_list}\n\n"
-        "Follow this exact format:\n"
-        "Thought: [Your reasoning]\n"
-        "Action: [Tool name][Tool input]\n\n"
-        "Do NOT output the Observation. You will receive it in the next turn.\n"
-        "Do NOT repeat the same Thought/Action sequence."
-    )
\ No newline at end of file
+@lru_cache(maxsize=16)
+def _render_prompt(tools_key: Tuple[Tuple[str, str], ...]) -> str:
+    """Renders the prompt for a (name, description) tool tuple; cached per tool set."""
+    tool_list = "\n".join([f"- {name}: {description}" for name, description in tools_key])
+    return _PROMPT_HEADER + tool_list + _PROMPT_FOOTER
+
+
+def get_agent_prompt(tools: Iterable[BaseTool]) -> str:
+    """ReAct (Yao et al., 2022) style system prompt, optimized for detailed reasoning."""
+    return _render_prompt(tuple((t.name, t.description) for t in tools))
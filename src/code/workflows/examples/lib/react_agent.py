@@ -1,6 +1,5 @@
 # react_agent_langgraph.py
 import asyncio
-import json
 import re
 from typing import Any, AsyncGenerator, Dict, List, Optional
 import os
@@ -9,6 +8,12 @@ from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, Base
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.tools import BaseTool, StructuredTool
 from langchain.tools import tool # Required for the @tool decorator
+import json
+try:
+    import orjson
+    _json_loads, _JSONDecodeError = orjson.loads, orjson.JSONDecodeError
+except ImportError:
+    _json_loads, _JSONDecodeError = json.loads, json.JSONDecodeError
 
 from dotenv import load_dotenv, find_dotenv
 
@@ -20,10 +25,41 @@ api_key = os.getenv("GOOGLE_API_KEY")
 
 ReActStreamEvent = Dict[str, str]  # {"type": "thought"|"observation"|"final_answer"|"error", "content": str}
 
+# Non-greedy matching (.*?) and numbered action support (Action\s*\d*:), compiled once at import
+_ACTION_REGEX = re.compile(r"Action\s*\d*:\s*([a-zA-Z0-9_-]+)\s*\[(.*?)\]", re.DOTALL)
+# Start of an (invented) Observation line; anything after it belongs to a later, dependent step
+_OBSERVATION_REGEX = re.compile(r"^\s*Observation\s*\d*:", re.MULTILINE)
+
+# Upper bound on tool calls from a single LLM turn that may run at the same time
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4"))
+
+
+def _loads_if_json(text: str) -> Any:
+    """Parses text as JSON when it starts like an object/array; plain strings skip the parser."""
+    if text.lstrip()[:1] in ("{", "["):
+        try:
+            return _json_loads(text)
+        except _JSONDecodeError:
+            pass
+    return text
+
+
+# Rendered system prompts, keyed by the ((name, description), ...) tuple of the tool set
+_PROMPT_CACHE: Dict[tuple, str] = {}
+
 
 def get_default_system_prompt(tools: List[BaseTool]) -> str:
-    """ReAct (Yao et al., 2022) style system prompt, optimized for detailed reasoning."""
-    tool_list = "\n".join([f"- {t.name}: {t.description}" for t in tools])
+    """ReAct (Yao et al., 2022) style system prompt, rendered once per tool set."""
+    key = tuple((t.name, t.description) for t in tools)
+    prompt = _PROMPT_CACHE.get(key)
+    if prompt is None:
+        prompt = _PROMPT_CACHE[key] = _render_system_prompt(key)
+    return prompt
+
+
+def _render_system_prompt(tools_key: tuple) -> str:
+    """Builds the ReAct prompt, optimized for detailed reasoning, from (name, description) pairs."""
+    tool_list = "\n".join([f"- {name}: {description}" for name, description in tools_key])
 
     return (
         "You are an intelligent reasoning agent that follows the ReAct format exactly.\n"
@@ -75,7 +111,7 @@ class ReActAgent:
         """Stream reasoning steps, tool outputs, and final answers."""
         self.messages.append(HumanMessage(content=user_input))
 
-        for _ in range(self.max_iterations):
+        for step in range(self.max_iterations):
             try:
                 
                 # Stream Thought and Action
@@ -86,72 +122,81 @@ class ReActAgent:
                 if not self._last_action:
                     raise ValueError("LLM did not produce an Action.")
 
-                full_text, action_name, action_input = self._last_action
+                full_text, actions = self._last_action
 
             except Exception as e:
                 yield {"type": "error", "content": str(e)}
                 return
 
-            # Add LLM reasoning to memory
-            self.messages.append(AIMessage(content=full_text))
+            # Add LLM reasoning to memory: the first step keeps its Thought as a format cue,
+            # later steps only their Action lines, so the prompt grows by actions, not thoughts
+            if step == 0:
+                self.messages.append(AIMessage(content=full_text))
+            else:
+                self.messages.append(AIMessage(content="\n".join([f"Action: {n}[{i}]" for n, i in actions])))
 
             # === FINISH ACTION ===
-            if action_name.lower() == "finish":
-                try:
-                    parsed = json.loads(action_input)
-                    final_answer = parsed.get("input", action_input)
-                except Exception:
-                    final_answer = action_input
+            # A finish anywhere in the turn short-circuits the other actions
+            finish_input = next((i for n, i in actions if n.lower() == "finish"), None)
+            if finish_input is not None:
+                parsed = _loads_if_json(finish_input)
+                final_answer = parsed.get("input", finish_input) if isinstance(parsed, dict) else finish_input
 
                 # ✅ Make sure it's a string
                 final_answer_str = str(final_answer)
 
-                for ch in final_answer_str:
-                    yield {"type": "final_answer", "content": ch}
+                yield {"type": "final_answer", "content": final_answer_str}
 
                 self.messages.append(AIMessage(content=final_answer_str))
                 return
 
-            # === TOOL ACTION ===
-            tool = self.tools.get(action_name)
-            if not tool:
-                yield {"type": "error", "content": f"Unknown tool '{action_name}'"}
+            # === TOOL ACTION(S) ===
+            unknown = next((n for n, _ in actions if n not in self.tools), None)
+            if unknown:
+                yield {"type": "error", "content": f"Unknown tool '{unknown}'"}
                 return
 
-            # Parse JSON input if possible
-            try:
-                parsed_input = json.loads(action_input)
-            except json.JSONDecodeError:
-                parsed_input = action_input
+            # Independent actions from the same turn run concurrently
+            semaphore = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+            results = await asyncio.gather(
+                *[self._execute_tool(n, i, semaphore) for n, i in actions],
+                return_exceptions=True,
+            )
 
-            try:
-                if asyncio.iscoroutinefunction(tool.invoke):
-                    observation = await tool.invoke(parsed_input)
-                else:
-                    observation = tool.invoke(parsed_input)
-            except Exception as e:
-                yield {"type": "error", "content": f"Tool error: {e}"}
+            error = next((r for r in results if isinstance(r, Exception)), None)
+            if error is not None:
+                yield {"type": "error", "content": f"Tool error: {error}"}
                 return
 
-            # Stream Observation
-            for ch in str(observation):
-                yield {"type": "observation", "content": ch}
+            for observation in results:
+                # Stream Observation (one event per tool result, not per character)
+                yield {"type": "observation", "content": str(observation)}
 
-            # Add observation to context
-            self.messages.append(HumanMessage(content=f"Observation: {observation}"))
+            # Add observations to context
+            self.messages.extend(
+                HumanMessage(content=f"Observation: {observation}") for observation in results
+            )
             length = len(self.messages)
 
             print(self.messages[length-1].content)
 
         yield {"type": "error", "content": "Max iterations reached without finishing."}
 
+    async def _execute_tool(self, action_name: str, action_input: str, semaphore: asyncio.Semaphore) -> Any:
+        """Run a single tool call, bounded by the per-turn semaphore."""
+        tool = self.tools[action_name]
+
+        # Parse JSON input if possible
+        parsed_input = _loads_if_json(action_input)
+
+        async with semaphore:
+            return await tool.ainvoke(parsed_input)
+
     async def _stream_thought_action(self) -> AsyncGenerator[ReActStreamEvent, None]:
         """
         Stream the LLM reasoning (Thoughts) and capture the Action command.
         """
         full_text = ""
-        # FIX: Non-greedy matching (.*?) and numbered action support (Action\s*\d*:)
-        action_regex = re.compile(r"Action\s*\d*:\s*([a-zA-Z0-9_-]+)\s*\[(.*?)\]", re.DOTALL)
 
         async for chunk in self.llm.astream(self.messages):
             content = getattr(chunk, "content", str(chunk))
@@ -160,16 +205,20 @@ class ReActAgent:
             # Simplified streaming: Stream ALL LLM output as "thought"
             yield {"type": "thought", "content": content}
 
-        # After LLM completes, parse the Action line
-        # FIX: Use findall to capture ALL actions and take the LAST one for robustness.
-        all_matches = action_regex.findall(full_text)
+        # After LLM completes, parse the Action lines of this step only. Actions after an
+        # Observation (e.g. "Action 2" of a numbered trajectory) depend on a result the model
+        # made up, so only those before the first Observation run together.
+        observation = _OBSERVATION_REGEX.search(full_text)
+        step_text = full_text[:observation.start()] if observation else full_text
+        all_matches = _ACTION_REGEX.findall(step_text)
         
         if not all_matches:
             raise ValueError(f"No Action found in LLM response:\n{full_text}")
 
-        # Extract the last valid action match
-        action_name, action_input = all_matches[-1]
-        self._last_action = (full_text, action_name.strip(), action_input.strip())
+        self._last_action = (
+            step_text,
+            [(action_name.strip(), action_input.strip()) for action_name, action_input in all_matches],
+        )
 
     async def invoke(self, user_input: str) -> AIMessage:
         """Run agent fully and return only the final answer."""
@@ -7,19 +7,54 @@ from langchain_core.tools import Tool
 import json
 import os
 import shutil
+import stat
 from typing import Any, AsyncGenerator, Dict, List, Optional
 from langchain.tools import tool # Required for the @tool decorator
 from langchain.tools import tool
 from google import genai
 from google.genai import types
 import math # Keep math import if you later need functions like sin/cos/sqrt
+import ast
+import collections
+import functools
+from types import CodeType
 from langchain.tools import tool # Required for the @tool decorator
 
 
+def is_cacheable_observation(observation: str) -> bool:
+    """
+    The tools below report failures as "ERROR ..." return values, not exceptions.
+    Those failures (network, quota, missing environment variables) may be transient,
+    so agent tool caches must not keep them.
+    """
+    return not observation.startswith("ERROR")
+
+
 # -------------------------------
 # 1. Calculator Tool (Consolidated)
 # -------------------------------
 
+# The only AST nodes an arithmetic expression may contain
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub,
+)
+
+# Digits, parentheses, basic operators, and decimal points survive sanitization;
+# every other ASCII character is deleted by a single C-level str.translate pass
+ALLOWED_CHARS = "0123456789.()+-*/ "
+_SANITIZE_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c) not in ALLOWED_CHARS))
+
+@functools.lru_cache(maxsize=256)
+def _compile_expr(expr: str) -> CodeType:
+    """Parses, validates and compiles an arithmetic expression; repeated expressions skip all three."""
+    tree = ast.parse(expr, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Unsupported element '{type(node).__name__}' in expression.")
+    return compile(tree, "<calc>", "eval")
+
 @tool
 def calculate(expression: str) -> str:
     """
@@ -32,16 +67,21 @@ def calculate(expression: str) -> str:
     try:
         # Step 1: Sanitize the input to prevent malicious code execution.
         # Allow digits, parentheses, basic operators, and decimal points.
-        allowed_chars = "0123456789.()+-*/ "
-        sanitized_expression = "".join(c for c in expression if c in allowed_chars)
+        sanitized_expression = expression.translate(_SANITIZE_TABLE)
+        if not sanitized_expression.isascii():
+            # Rare non-ASCII leftovers are outside the table; drop them the slow way
+            sanitized_expression = "".join(c for c in sanitized_expression if c in ALLOWED_CHARS)
+        # Deleted words leave leading spaces, which ast.parse rejects (eval() used to strip them);
+        # stripping here also normalizes the compile cache key
+        sanitized_expression = sanitized_expression.strip()
         
         # Check if the sanitized expression is empty or just whitespace
-        if not sanitized_expression.strip():
+        if not sanitized_expression:
              return f"ERROR: Invalid or empty mathematical expression."
 
         # Step 2: Evaluate the expression.
-        # We rely on the sanitization to ensure safety before using eval().
-        result = eval(sanitized_expression)
+        # Only whitelisted arithmetic nodes get compiled, and nothing is reachable from the globals.
+        result = eval(_compile_expr(sanitized_expression), {"__builtins__": {}}, {})
         
         return f"SUCCESS: The result of '{expression}' is {result}."
         
@@ -59,6 +99,15 @@ def calculate(expression: str) -> str:
 # 2. Code  Executing Tools
 # -------------------------------
 
+@functools.lru_cache(maxsize=1)
+def _genai_client() -> genai.Client:
+    """One shared Gemini client, created on first use (credentials are read then, not at import)."""
+    return genai.Client()
+
+_CODE_EXEC_CFG = types.GenerateContentConfig(
+    tools=[types.Tool(code_execution=types.ToolCodeExecution)]
+)
+
 @tool
 def code_execute(contents:str):
     """
@@ -67,13 +116,10 @@ def code_execute(contents:str):
     Args:
         contents: content of the code.
     """
-    client = genai.Client()
-    response = client.models.generate_content(
+    response = _genai_client().models.generate_content(
         model="gemini-2.5-flash",
         contents=contents,
-        config=types.GenerateContentConfig(
-            tools=[types.Tool(code_execution=types.ToolCodeExecution)]
-        ),
+        config=_CODE_EXEC_CFG,
     )
 
     for part in response.candidates[0].content.parts:
@@ -92,6 +138,17 @@ import shlex
 from langchain.tools import tool
 
 
+MAX_SHELL_OUTPUT = 16384  # Max bytes of stdout/stderr returned from a shell command
+
+def _decode_output(data) -> str:
+    """Decodes captured command output once, capped at MAX_SHELL_OUTPUT bytes."""
+    if not data:
+        return ""
+    text = data[:MAX_SHELL_OUTPUT].decode("utf-8", errors="replace")
+    if len(data) > MAX_SHELL_OUTPUT:
+        text += f"\n... [TRUNCATED at {MAX_SHELL_OUTPUT} bytes]"
+    return text
+
 @tool
 def run_shell_command(command: str) -> str:
     """
@@ -128,18 +185,17 @@ def run_shell_command(command: str) -> str:
         # which are hard to parse otherwise.
         print(command)
         # Let's use a 5-second timeout for safety
+        # Output is captured as bytes and decoded once, after capping it
         process = subprocess.run(
             command,
             shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+            capture_output=True,
             timeout=10, # 10-second timeout
             check=True   # Raise an error if the command fails
         )
         
-        stdout = process.stdout
-        stderr = process.stderr
+        stdout = _decode_output(process.stdout)
+        stderr = _decode_output(process.stderr)
         print(stdout, stderr)
         
         if stdout and stderr:
@@ -156,11 +212,11 @@ def run_shell_command(command: str) -> str:
         # Command returned a non-zero exit code
         return (
             f"ERROR: Command failed with exit code {e.returncode}.\n"
-            f"[STDOUT]:\n{e.stdout}\n"
-            f"[STDERR]:\n{e.stderr}"
+            f"[STDOUT]:\n{_decode_output(e.stdout)}\n"
+            f"[STDERR]:\n{_decode_output(e.stderr)}"
         )
     except subprocess.TimeoutExpired as e:
-        return f"ERROR: Command timed out after 10 seconds.\n[STDOUT]:\n{e.stdout}\n[STDERR]:\n{e.stderr}"
+        return f"ERROR: Command timed out after 10 seconds.\n[STDOUT]:\n{_decode_output(e.stdout)}\n[STDERR]:\n{_decode_output(e.stderr)}"
     except Exception as e:
         return f"ERROR executing command '{command}': {type(e).__name__}: {e}"
                
@@ -169,9 +225,56 @@ def run_shell_command(command: str) -> str:
 # 2. File System Tools (Enhanced)
 # -------------------------------
 # Define limits to protect the LLM's context window
-MAX_READ_SIZE = 10000  # Max characters to read from a file
+MAX_READ_SIZE = 10000  # Max bytes to read from a file
 MAX_LIST_COUNT = 100   # Max items to list from a directory
 
+# orjson serializes listings several times faster when installed; json (same compact
+# layout) is the fallback and also takes what orjson rejects, such as the surrogate-escaped
+# undecodable filenames os.scandir returns on Linux
+_json_dumps = functools.partial(json.dumps, separators=(",", ":"))
+try:
+    import orjson
+    def _dumps(obj: Any) -> str:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            return _json_dumps(obj)
+except ImportError:
+    _dumps = _json_dumps
+
+def _classify(path: str):
+    """
+    Probes a path with a single stat() (following symlinks, like os.path.exists/isdir/isfile).
+    Returns (stat_result, is_dir, is_file), or (None, False, False) if nothing is there.
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, ValueError):
+        return None, False, False
+    return st, stat.S_ISDIR(st.st_mode), stat.S_ISREG(st.st_mode)
+
+_Probe = collections.namedtuple(
+    "_Probe", "src_exists src_is_dir src_is_file dest_exists dest_is_dir final_dest final_dest_existed"
+)
+
+def _probe_move_dest(src_path: str, dest_path: str) -> _Probe:
+    """
+    Gathers everything move/copy need to know about source and destination up front:
+    one stat per path, plus one for the final path only when the destination is a directory.
+    """
+    src_st, src_is_dir, src_is_file = _classify(src_path)
+    dest_st, dest_is_dir, _ = _classify(dest_path)
+    if dest_is_dir:
+        final_dest = os.path.join(dest_path, os.path.basename(src_path))
+        final_dest_existed = _classify(final_dest)[0] is not None
+    else:
+        final_dest = dest_path
+        final_dest_existed = dest_st is not None
+    return _Probe(
+        src_st is not None, src_is_dir, src_is_file,
+        dest_st is not None, dest_is_dir, final_dest, final_dest_existed,
+    )
+
 # -------------------------------
 # 2. File System Tool (Consolidated)
 # -------------------------------
@@ -179,20 +282,40 @@ MAX_LIST_COUNT = 100   # Max items to list from a directory
 def _read_file_logic(file_path: str) -> str:
     """Internal logic for reading a file, truncating large ones."""
     try:
-        if not os.path.exists(file_path):
+        st, is_dir, _ = _classify(file_path)
+        if st is None:
             return f"ERROR: File not found at '{file_path}'."
-        if os.path.isdir(file_path):
+        if is_dir:
             return f"ERROR: Path '{file_path}' is a directory. Use 'list' operation."
         
-        file_size = os.path.getsize(file_path)
+        file_size = st.st_size
         if file_size == 0:
             return f"SUCCESS: Read file '{file_path}'. The file is [EMPTY]."
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read(MAX_READ_SIZE + 1)
+        # One unbuffered read of at most MAX_READ_SIZE + 1 bytes, without BufferedReader/TextIOWrapper.
+        # O_BINARY keeps the Windows CRT from translating CRLF or stopping at Ctrl-Z.
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            raw = os.read(fd, MAX_READ_SIZE + 1)
+        finally:
+            os.close(fd)
+
+        truncated = len(raw) > MAX_READ_SIZE
+        if truncated:
+            raw = raw[:MAX_READ_SIZE]
+        try:
+            content = raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # The cap may cut the last multi-byte character in half; any other error means not text
+            if not truncated or e.end != len(raw):
+                raise
+            content = raw[:e.start].decode("utf-8")
+        if "\r" in content:
+            # Same newline translation text mode would have applied
+            content = content.replace("\r\n", "\n").replace("\r", "\n")
         
-        if len(content) > MAX_READ_SIZE:
-            return f"SUCCESS: Read file '{file_path}'. Content [TRUNCATED] to {MAX_READ_SIZE} chars:\n{content[:MAX_READ_SIZE]}..."
+        if truncated:
+            return f"SUCCESS: Read file '{file_path}'. Content [TRUNCATED] to {MAX_READ_SIZE} bytes:\n{content}..."
         else:
             return f"SUCCESS: Read file '{file_path}'. Content:\n{content}"
             
@@ -207,17 +330,20 @@ def _write_file_logic(file_path: str, content: str) -> str:
     """Internal logic for writing/overwriting a file with verification."""
     content_size = len(content)
     try:
-        if os.path.isdir(file_path):
+        _, is_dir, _ = _classify(file_path)
+        if is_dir:
             return f"ERROR writing to file: '{file_path}' is an existing directory, not a file."
 
-        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        # Only create missing parents; an existing (or current) directory costs one probe at most
+        parent = os.path.dirname(file_path)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent, exist_ok=True)
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
+            f.flush()
+            # Verify through the open descriptor instead of re-stat'ing the path
+            verified_size = os.fstat(f.fileno()).st_size
         
-        if not os.path.exists(file_path):
-            return f"ERROR writing to file '{file_path}': Write operation succeeded internally, but the file was NOT found on the filesystem during verification."
-        
-        verified_size = os.path.getsize(file_path)
         if verified_size == 0 and content_size > 0:
             return f"WARNING writing to file '{file_path}': File was created, but size is 0 bytes. Expected {content_size} characters. Review content or permissions."
 
@@ -230,8 +356,7 @@ def _write_file_logic(file_path: str, content: str) -> str:
 
 def _delete_file_logic(path: str) -> str:
     """Internal logic for deleting a file or directory with verification."""
-    is_dir = os.path.isdir(path)
-    is_file = os.path.isfile(path)
+    _, is_dir, is_file = _classify(path)
 
     if not (is_dir or is_file):
         return f"WARNING: No file or directory found at path: '{path}'. Nothing was deleted."
@@ -255,17 +380,19 @@ def _delete_file_logic(path: str) -> str:
 def _append_file_logic(file_path: str, content: str) -> str:
     """Internal logic for appending content to an existing file."""
     try:
-        if not os.path.exists(file_path):
+        st, is_dir, _ = _classify(file_path)
+        if st is None:
              return f"ERROR: File not found at '{file_path}'. Use 'write' operation to create it first."
-        if os.path.isdir(file_path):
+        if is_dir:
             return f"ERROR: Path '{file_path}' is a directory. Cannot append."
             
-        before_size = os.path.getsize(file_path)
-        
+        # Append mode starts at the end of the file, so tell() gives both sizes without a stat()
         with open(file_path, "a", encoding="utf-8") as f:
+            before_size = f.tell()
             f.write(content)
+            f.flush()
+            after_size = f.tell()
             
-        after_size = os.path.getsize(file_path)
         appended_size = after_size - before_size
         
         return f"SUCCESS: Appended {len(content)} characters (verified {appended_size} bytes) to '{file_path}'. New size: {after_size} bytes."
@@ -278,19 +405,12 @@ def _append_file_logic(file_path: str, content: str) -> str:
 def _move_file_logic(src_path: str, dest_path: str) -> str:
     """Internal logic for moving or renaming a file/directory with verification."""
     try:
-        if not os.path.exists(src_path):
+        probe = _probe_move_dest(src_path, dest_path)
+        if not probe.src_exists:
             return f"ERROR: Source path '{src_path}' does not exist. Nothing to move."
 
-        dest_exists = os.path.exists(dest_path)
-        dest_is_dir = os.path.isdir(dest_path)
-        src_basename = os.path.basename(src_path)
-        
-        if dest_is_dir:
-            final_dest_path = os.path.join(dest_path, src_basename)
-        else:
-            final_dest_path = dest_path
-            
-        final_dest_existed = os.path.exists(final_dest_path)
+        dest_exists, dest_is_dir = probe.dest_exists, probe.dest_is_dir
+        final_dest_path, final_dest_existed = probe.final_dest, probe.final_dest_existed
 
         shutil.move(src_path, dest_path)
         
@@ -314,28 +434,49 @@ def _move_file_logic(src_path: str, dest_path: str) -> str:
         return f"ERROR moving file from '{src_path}' to '{dest_path}': {type(e).__name__}: {e}"
 
 
+def _fast_copy(src_path: str, dest_path: str) -> None:
+    """
+    Copies file contents inside the kernel with copy_file_range (a reflink on btrfs/XFS),
+    falling back to a 1 MiB buffered copy where that call is unsupported. Platforms without
+    copy_file_range keep shutil's own fast path (sendfile/fcopyfile/CopyFile2).
+    """
+    if not hasattr(os, "copy_file_range"):
+        shutil.copyfile(src_path, dest_path)
+        return
+    with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        try:
+            # Pseudo-filesystems (procfs/sysfs) can answer 0 straight away although they
+            # have content, so an immediate 0 is re-checked with a plain read below
+            copied = os.copy_file_range(src.fileno(), dest.fileno(), 1 << 30)
+            while copied and os.copy_file_range(src.fileno(), dest.fileno(), 1 << 30):
+                pass
+        except OSError:
+            copied = 0
+        if not copied:
+            src.seek(0)
+            dest.seek(0)
+            dest.truncate()
+            shutil.copyfileobj(src, dest, 1 << 20)
+
 def _copy_file_logic(src_path: str, dest_path: str) -> str:
     """Internal logic for copying a file with verification."""
     try:
-        if not os.path.exists(src_path):
+        probe = _probe_move_dest(src_path, dest_path)
+        if not probe.src_exists:
             return f"ERROR: Source path '{src_path}' does not exist. Nothing to copy."
-        if os.path.isdir(src_path):
+        if probe.src_is_dir:
             return f"ERROR: Source path '{src_path}' is a directory. This operation only copies single files."
-        if not os.path.isfile(src_path):
+        if not probe.src_is_file:
             return f"ERROR: Source path '{src_path}' is not a file."
 
-        dest_exists = os.path.exists(dest_path)
-        dest_is_dir = os.path.isdir(dest_path)
-        src_basename = os.path.basename(src_path)
-        
-        if dest_is_dir:
-            final_dest_path = os.path.join(dest_path, src_basename)
-        else:
-            final_dest_path = dest_path
-            
-        final_dest_existed = os.path.exists(final_dest_path)
+        dest_exists, dest_is_dir = probe.dest_exists, probe.dest_is_dir
+        final_dest_path, final_dest_existed = probe.final_dest, probe.final_dest_existed
 
-        shutil.copy2(src_path, dest_path)
+        # Same contract as shutil.copy2: refuse to copy a file onto itself, then copy data + metadata
+        if final_dest_existed and os.path.samefile(src_path, final_dest_path):
+            raise shutil.SameFileError(f"{src_path!r} and {final_dest_path!r} are the same file")
+        _fast_copy(src_path, final_dest_path)
+        shutil.copystat(src_path, final_dest_path)
         
         if not os.path.exists(src_path):
             return f"ERROR: Source file '{src_path}' is missing after copy. This should not happen."
@@ -359,40 +500,52 @@ def _copy_file_logic(src_path: str, dest_path: str) -> str:
 def _list_dir_logic(directory_path: str, extensions: List[str] = None) -> str:
     """Internal logic for listing a directory's contents with filtering and truncation."""
     try:
-        if not os.path.exists(directory_path):
+        st, is_dir, _ = _classify(directory_path)
+        if st is None:
             return f"ERROR: Directory not found at '{directory_path}'."
-        if not os.path.isdir(directory_path):
+        if not is_dir:
             return f"ERROR: Path '{directory_path}' is a file, not a directory. Use 'read' operation."
 
         directories = []
         files = []
+        dappend, fappend = directories.append, files.append
+        # str.endswith takes a tuple, so the extension filter is one C-level call per entry
+        ext_tuple = tuple(extensions) if extensions else None
+        truncated = False
         
         with os.scandir(directory_path) as it:
             for entry in it:
                 if len(directories) + len(files) >= MAX_LIST_COUNT:
-                    if entry.is_dir():
-                        directories.append(f"... [TRUNCATED at {MAX_LIST_COUNT} items]")
-                    else:
-                        files.append(f"... [TRUNCATED at {MAX_LIST_COUNT} items]")
+                    truncated = True
                     break
 
-                if entry.is_dir():
-                    directories.append(entry.name)
-                elif entry.is_file():
-                    if extensions:
-                        if any(entry.name.endswith(ext) for ext in extensions):
-                            files.append(entry.name)
-                    else:
-                        files.append(entry.name)
+                # One d_type-backed check per entry; everything that is not a directory lists as a file
+                if entry.is_dir(follow_symlinks=False):
+                    dappend(entry.name)
+                elif ext_tuple is None or entry.name.endswith(ext_tuple):
+                    fappend(entry.name)
+
+        if truncated:
+            files.append(f"... [TRUNCATED at {MAX_LIST_COUNT} items]")
         
-        result = {"directories": directories, "files": files}
-        return f"SUCCESS: Contents of '{directory_path}': {json.dumps(result)}"
+        return f"SUCCESS: Contents of '{directory_path}': {_dumps({'directories': directories, 'files': files})}"
 
     except PermissionError:
         return f"ERROR: Permission denied when listing directory '{directory_path}'."
     except Exception as e:
         return f"ERROR listing directory '{directory_path}': {type(e).__name__}: {e}"
 
+# file_manager dispatch table: operation name -> implementation
+_FILE_OPS = {
+    "read": _read_file_logic,
+    "write": _write_file_logic,
+    "delete": _delete_file_logic,
+    "append": _append_file_logic,
+    "move": _move_file_logic,
+    "copy": _copy_file_logic,
+    "list": _list_dir_logic,
+}
+
 @tool
 def file_manager(operation: str, args: Dict[str, Any]) -> str:
     """
@@ -410,28 +563,13 @@ def file_manager(operation: str, args: Dict[str, Any]) -> str:
               - 'copy': {'src_path': str, 'dest_path': str}
               - 'list': {'directory_path': str, 'extensions': List[str] (optional)}
     """
-    op = operation.lower().strip()
+    handler = _FILE_OPS.get(operation.lower().strip())
+    if handler is None:
+        return f"ERROR: Invalid operation '{operation}'. Must be one of: read, write, delete, append, move, copy, list."
     
     try:
-        if op == 'read':
-            return _read_file_logic(**args)
-        elif op == 'write':
-            return _write_file_logic(**args)
-        elif op == 'delete':
-            return _delete_file_logic(**args)
-        elif op == 'append':
-            return _append_file_logic(**args)
-        elif op == 'move':
-            return _move_file_logic(**args)
-        elif op == 'copy':
-            return _copy_file_logic(**args)
-        elif op == 'list':
-            # Handle optional 'extensions' argument for list operation
-            if 'extensions' not in args:
-                args['extensions'] = None
-            return _list_dir_logic(**args)
-        else:
-            return f"ERROR: Invalid operation '{operation}'. Must be one of: read, write, delete, append, move, copy, list."
+        # 'extensions' is optional for 'list'; _list_dir_logic defaults it to None
+        return handler(**args)
     
     except TypeError as e:
         return f"ERROR: Missing or incorrect arguments for operation '{operation}'. Details: {e}. Check the required 'args' dictionary in the tool description."
@@ -439,20 +577,48 @@ def file_manager(operation: str, args: Dict[str, Any]) -> str:
         return f"ERROR: An unexpected error occurred in the file_manager dispatch for '{operation}': {e}"
 
 
-async def finish_logic(input: str) -> str:
+def _finish_sync(input: str) -> str:
     """This tool is the final action to return the answer."""
     return input
 
+async def _finish_async(input: str) -> str:
+    """Async twin of _finish_sync for ainvoke callers."""
+    return input
+
 finish = Tool(
     name="finish",
     description="The FINAL action to take. Use this when you have the complete, final answer. The input should be the final answer.",
-    func=finish_logic,
-    coroutine=finish_logic
+    func=_finish_sync,
+    coroutine=_finish_async
 )
 
 # -------------------------------
 # 1. Search Tool (Robust)
 # -------------------------------
+@functools.lru_cache(maxsize=1)
+def _search_wrapper(google_api_key: str, google_cse_id: str) -> GoogleSearchAPIWrapper:
+    """
+    Cached search client (top 5 results). Building one loads the API discovery document,
+    so it is reused across calls; it is keyed on the credentials it was built from.
+    """
+    return GoogleSearchAPIWrapper(k=5, google_api_key=google_api_key, google_cse_id=google_cse_id)
+
+# (GOOGLE_API_KEY, GOOGLE_CSE_ID) once both are found; until then every call re-reads the
+# environment, so credentials exported after import are still picked up
+_search_env: Optional[tuple] = None
+
+def _search_credentials():
+    """Returns the cached search credentials, or the name of the first missing variable."""
+    global _search_env
+    if _search_env is None:
+        api_key, cse_id = os.environ.get("GOOGLE_API_KEY"), os.environ.get("GOOGLE_CSE_ID")
+        if cse_id is None:
+            return "GOOGLE_CSE_ID"
+        if api_key is None:
+            return "GOOGLE_API_KEY"
+        _search_env = (api_key, cse_id)
+    return _search_env
+
 @tool
 def google_search(query: str) -> str:
     """
@@ -462,17 +628,16 @@ def google_search(query: str) -> str:
     Args:
         query: The query to search for.
     """
-    # Check for required environment variables
-    if "GOOGLE_CSE_ID" not in os.environ:
-        return "ERROR: The 'GOOGLE_CSE_ID' environment variable is not set. This tool cannot function."
-    if "GOOGLE_API_KEY" not in os.environ:
-        return "ERROR: The 'GOOGLE_API_KEY' environment variable is not set. This tool cannot function."
+    # Check for required environment variables (read once, then cached)
+    credentials = _search_credentials()
+    if isinstance(credentials, str):
+        return f"ERROR: The '{credentials}' environment variable is not set. This tool cannot function."
 
     try:
-        # Note: By default, this wrapper uses the GOOGLE_API_KEY and GOOGLE_CSE_ID
-        # environment variables, so we don't need to pass them in.
+        # The wrapper is built from the GOOGLE_API_KEY and GOOGLE_CSE_ID
+        # environment variables and cached between calls.
         print("Google searching...")
-        search_wrapper = GoogleSearchAPIWrapper(k=5) # Get top 5 results
+        search_wrapper = _search_wrapper(*credentials)
         
         # .results() returns a list of dictionaries
         # .run() returns a formatted string, which is better for an LLM Observation
@@ -489,26 +654,20 @@ def google_search(query: str) -> str:
 
         return f"ERROR running search for '{query}': {type(e).__name__}: {e}"
     
+_SEARCH_CFG = types.GenerateContentConfig(
+    tools=[types.Tool(google_search=types.GoogleSearch())]
+)
+
 @tool
 def search(query:str):
     """Grounding with Google Search connects the Gemini model to real-time web content and works with all available languages. This allows Gemini to provide more accurate answers and cite verifiable sources beyond its knowledge cutoff.
     Args:
         query: The query to search for.
     """
-    client = genai.Client()
-
-    grounding_tool = types.Tool(
-        google_search=types.GoogleSearch()
-    )
-
-    config = types.GenerateContentConfig(
-        tools=[grounding_tool]
-    )
-
-    response = client.models.generate_content(
+    response = _genai_client().models.generate_content(
         model="gemini-2.5-flash",
         contents=query,
-        config=config,
+        config=_SEARCH_CFG,
     )
     results = response.text
     print(response)
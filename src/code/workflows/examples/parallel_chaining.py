@@ -1,5 +1,6 @@
 from langgraph.graph import StateGraph, MessagesState, START, END
 from typing_extensions import TypedDict
+from langchain_core.prompts import ChatPromptTemplate
 from lib.models import groq
 import asyncio
 
@@ -10,39 +11,44 @@ class State(TypedDict):
     poem: str 
     aggregated:str
 
+# One shared client; the three branches below await it concurrently
+llm = groq()
+
+# Prompt templates piped into the model once; nodes only fill in the placeholder
+JOKE_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple joke about '{topic}'")]) | llm
+STORY_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple story about '{topic}'")]) | llm
+POEM_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple poem about '{topic}'")]) | llm
+
     
-def joke(state: State):
+async def joke(state: State):
     """
     llm write a joke from the user topic
     """
     topic = state.get("topic")
     # print(state.items())
-    llm = groq()
-    response = llm.invoke(["human", f"""Write a simple joke about '{topic}'"""])
+    response = await JOKE_CHAIN.ainvoke({"topic": topic})
     # print(response)
-    return {"joke": response.text}
+    return {"joke": response.content}
 
-def story(state: State):
+async def story(state: State):
     """
     llm write a story from the user topic
     """
     topic = state.get("topic")
     # print(state.items())
-    llm = groq()
-    response = llm.invoke(["human", f"""Write a simple story about '{topic}'"""])
+    response = await STORY_CHAIN.ainvoke({"topic": topic})
     # print(response)
-    return {"story": response.text}
+    return {"story": response.content}
 
-def poem(state: State):
+async def poem(state: State):
     """
     llm write a poem from the user topic
     """
     topic = state.get("topic")
     # print(state.items())
-    llm = groq()
-    response = llm.invoke(["human", f"""Write a simple poem about '{topic}'"""])
+    response = await POEM_CHAIN.ainvoke({"topic": topic})
     # print(response)
-    return {"poem": response.text}
+    return {"poem": response.content}
 
 
 def aggregate(state: State):
@@ -65,13 +71,13 @@ graph.add_edge(START, "poem")
 
 graph.add_edge("joke", "aggregate")
 graph.add_edge("story", "aggregate")
-graph.add_edge("story", "aggregate")
+graph.add_edge("poem", "aggregate")
 graph.add_edge("aggregate", END)
 graph = graph.compile()
 
 async def main(query):
    if(query.strip()):
-        state = graph.invoke({"topic": query})
+        state = await graph.ainvoke({"topic": query})
         print(state["aggregated"])
 
 # === Example Usage ===
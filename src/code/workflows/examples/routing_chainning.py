@@ -1,7 +1,9 @@
 from langgraph.graph import StateGraph, MessagesState, START, END
 from typing_extensions import Literal, TypedDict
+from langchain_core.prompts import ChatPromptTemplate
 from lib.models import groq
 import asyncio
+import functools
 from pydantic import BaseModel, Field
 
 class State(TypedDict): 
@@ -9,9 +11,19 @@ class State(TypedDict):
     decision: str
     output: str
 llm = groq()
+
+# Prompt templates piped into the model once; nodes only fill in the placeholder
+JOKE_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple joke about '{input}'")]) | llm
+STORY_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple story about '{input}'")]) | llm
+POEM_CHAIN = ChatPromptTemplate.from_messages([("human", "Write a simple poem about '{input}'")]) | llm
+
 class Router(BaseModel):
     step: Literal["joke", "story", "poem"] = Field(description="The next step")
 
+@functools.lru_cache(maxsize=1)
+def _router_llm():
+    """Structured-output router client, built on first use and reused afterwards."""
+    return llm.with_structured_output(Router)
     
 def joke(state: State):
     """
@@ -19,10 +31,9 @@ def joke(state: State):
     """
     input = state.get("input")
     # print(state.items())
-    llm = groq()
-    response = llm.invoke(["human", f"""Write a simple joke about '{input}'"""])
+    response = JOKE_CHAIN.invoke({"input": input})
     print("Joke")
-    return {"output": response.text}
+    return {"output": response.content}
 
 def story(state: State):
     """
@@ -30,12 +41,10 @@ def story(state: State):
     """
     input = state.get("input")
     # print(state.items())
-    llm = groq()
-
-    response = llm.invoke(["human", f"""Write a simple story about '{input}'"""])
+    response = STORY_CHAIN.invoke({"input": input})
     # print(response)
     print("Story")
-    return {"output": response.text}
+    return {"output": response.content}
 
 def poem(state: State):
     """
@@ -43,29 +52,24 @@ def poem(state: State):
     """
     input = state.get("input")
     # print(state.items())
-    llm = groq()
-    response = llm.invoke(["human", f"""Write a simple poem about '{input}'"""])
+    response = POEM_CHAIN.invoke({"input": input})
     # print(response)
     # print("Poem")
-    return {"output": response.text}
+    return {"output": response.content}
 
 
 def router(state: State):
-    llm = groq().with_structured_output(Router)
-
-    response = llm.invoke(state["input"])
+    response = _router_llm().invoke(state["input"])
     step = response.step
     # print(step)
     return {"decision": step}
 
+# Router decision -> node name; also handed to LangGraph as the conditional edge map
+_ROUTE = {"joke": "joke", "poem": "poem", "story": "story"}
+
 def handleDecision(state: State):
-    decision = state["decision"]
-    # print(decision)
-    if "joke" in decision:
-        return "joke"
-    elif "poem" in decision:
-        return "poem"
-    else: return "story"
+    # print(state["decision"])
+    return _ROUTE.get(state["decision"].strip().lower(), "story")
 
 
 graph = StateGraph(State)
@@ -74,11 +78,11 @@ graph.add_node(story)
 graph.add_node(poem)
 graph.add_node(router)
 graph.add_edge(START, 'router')
-graph.add_conditional_edges("router", handleDecision)
+graph.add_conditional_edges("router", handleDecision, _ROUTE)
 
 graph.add_edge("joke", END)
 graph.add_edge("story", END)
-graph.add_edge("story", END)
+graph.add_edge("poem", END)
 
 graph = graph.compile()
 